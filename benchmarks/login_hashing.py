@@ -0,0 +1,104 @@
+"""Benchmark do login com e sem o pool de hash de senhas.
+
+Simula um pico de logins (várias threads verificando senhas, como um servidor
+WSGI com threads) enquanto outra thread atende requisições leves, e mostra a
+vazão dos logins e o p99 de ambos.
+
+Uso:
+    python benchmarks/login_hashing.py --threads 16 --logins 200 --workers 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from passwords import PasswordHasher, PasswordPoolBusy  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def light_request():
+    # Trabalho típico de uma rota simples (serialização de alguns itens)
+    return sum(len(str(i)) for i in range(2000))
+
+
+def run(hasher, threads, logins, pwhash):
+    login_latencies = []
+    light_latencies = []
+    rejected = 0
+    stop = threading.Event()
+
+    def do_login(_):
+        nonlocal rejected
+        start = time.perf_counter()
+        try:
+            hasher.verify(pwhash, 'senha-secreta')
+        except PasswordPoolBusy:
+            rejected += 1
+            return
+        login_latencies.append(time.perf_counter() - start)
+
+    def light_traffic():
+        while not stop.is_set():
+            start = time.perf_counter()
+            light_request()
+            light_latencies.append(time.perf_counter() - start)
+            time.sleep(0.001)
+
+    # Aquece o pool antes de medir
+    hasher.verify(pwhash, 'senha-secreta')
+
+    light_thread = threading.Thread(target=light_traffic)
+    light_thread.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(do_login, range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    light_thread.join()
+
+    return {
+        'throughput': len(login_latencies) / elapsed,
+        'login_p50': statistics.median(login_latencies) * 1000,
+        'login_p99': percentile(login_latencies, 99) * 1000,
+        'light_p99': percentile(light_latencies, 99) * 1000,
+        'rejected': rejected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16, help='threads de requisição simultâneas')
+    parser.add_argument('--logins', type=int, default=200, help='total de logins no pico')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processos do pool')
+    parser.add_argument('--method', default='scrypt:32768:8:1', help='método de hash do werkzeug')
+    args = parser.parse_args()
+
+    pwhash = PasswordHasher(workers=0, method=args.method).hash('senha-secreta')
+
+    # Fila grande o bastante para não rejeitar logins durante a medição
+    scenarios = [
+        ('sem pool', PasswordHasher(method=args.method, workers=0)),
+        (f'pool ({args.workers} processos)',
+         PasswordHasher(method=args.method, workers=args.workers, queue_limit=args.threads)),
+    ]
+
+    print(f'{"cenário":<24}{"logins/s":>10}{"login p50":>12}{"login p99":>12}{"leve p99":>12}{"rejeitados":>12}')
+    for name, hasher in scenarios:
+        result = run(hasher, args.threads, args.logins, pwhash)
+        hasher.shutdown()
+        print(f'{name:<24}{result["throughput"]:>10.1f}{result["login_p50"]:>10.1f}ms'
+              f'{result["login_p99"]:>10.1f}ms{result["light_p99"]:>10.2f}ms{result["rejected"]:>12}')
+
+
+if __name__ == '__main__':
+    main()
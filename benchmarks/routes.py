@@ -0,0 +1,248 @@
+"""Benchmark reproduzível das rotas da aplicação.
+
+Popula um banco local (SQLite temporário por padrão, ou o PostgreSQL indicado)
+com volumes configuráveis, dispara requisições concorrentes pelo test client do Flask e
+mostra a vazão e os percentis p50/p95/p99 de cada rota. Os resultados podem ser
+salvos como baseline em JSON e comparados em execuções futuras: o script
+termina com erro se alguma rota piorar além do limite. O baseline guarda também
+os parâmetros da execução, e a comparação só é feita com os mesmos parâmetros.
+
+O cache de leitura fica desligado por padrão, para que as rotas meçam as
+consultas ao banco; ``--cache`` mede o cenário com o cache ligado.
+
+Para popular, todas as tabelas do banco são apagadas e recriadas; um banco que
+já tem tabelas só é usado com ``--reset`` (ou com ``--no-seed``, sem alterar os
+dados). Nunca aponte para um banco com dados reais.
+
+Uso:
+    python benchmarks/routes.py --users 10000 --notes 100000 --checklist 100000 --events 100000 \\
+        --save benchmarks/baseline.json
+    python benchmarks/routes.py --users 10000 --notes 100000 --checklist 100000 --events 100000 \\
+        --compare benchmarks/baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+import main  # noqa: E402
+
+PASSWORD = 'senha-benchmark'
+BATCH_SIZE = 5000
+FIRST_DAY = datetime(2024, 1, 1)
+DAYS = 730
+WORDS = ['reunião', 'projeto', 'mercado', 'estudo', 'viagem', 'consulta', 'treino', 'aniversário',
+         'relatório', 'pagamento', 'leitura', 'curso', 'entrega', 'revisão', 'férias']
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def sentence(rng, size):
+    return ' '.join(rng.choice(WORDS) for _ in range(size))
+
+
+def insert_rows(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        main.db.session.execute(insert(model), rows[start:start + BATCH_SIZE])
+    main.db.session.commit()
+
+
+def seed(args, rng):
+    main.db.drop_all()
+    main.db.create_all()
+
+    # Todos os usuários compartilham o mesmo hash para não gastar minutos gerando senhas
+    pwhash = main.password_hasher.hash(PASSWORD)
+    insert_rows(main.User, [
+        {'name': f'Usuário {i}', 'email': f'user{i}@planit.test', 'password': pwhash, 'checklist_version': 0}
+        for i in range(1, args.users + 1)
+    ])
+    insert_rows(main.Note, [
+        {'title': sentence(rng, 3), 'content': sentence(rng, 30), 'user_id': rng.randint(1, args.users)}
+        for _ in range(args.notes)
+    ])
+    insert_rows(main.Checklist, [
+        {'name': sentence(rng, 4), 'checked': rng.random() < 0.5, 'user_id': rng.randint(1, args.users),
+         'position': i, 'version': 0, 'deleted': False}
+        for i in range(args.checklist)
+    ])
+    insert_rows(main.CalendarEvent, [
+        {'title': sentence(rng, 3), 'description': sentence(rng, 10), 'user_id': rng.randint(1, args.users),
+         'date': FIRST_DAY + timedelta(minutes=rng.randint(0, DAYS * 24 * 60))}
+        for _ in range(args.events)
+    ])
+
+
+def month_window(rng):
+    start = FIRST_DAY + timedelta(days=30 * rng.randint(0, DAYS // 30 - 1))
+    return f'start={start:%Y-%m-%d}&end={start + timedelta(days=42):%Y-%m-%d}'
+
+
+# Cada rota recebe o gerador aleatório e devolve (método, url, dados do formulário)
+ROUTES = {
+    'GET /calendar': lambda rng, users: ('GET', '/calendar', None),
+    'GET /_events': lambda rng, users: ('GET', f'/_events?{month_window(rng)}', None),
+    'GET /notes': lambda rng, users: ('GET', '/notes', None),
+    'GET /_notes/search': lambda rng, users: ('GET', f'/_notes/search?q={rng.choice(WORDS)}', None),
+    'GET /_checklist': lambda rng, users: ('GET', '/_checklist', None),
+    'POST /login': lambda rng, users: (
+        'POST', '/login', {'email': f'user{rng.randint(1, users)}@planit.test', 'password': PASSWORD}),
+}
+
+
+def bench_route(app, route, args, seed_value):
+    build = ROUTES[route]
+
+    def worker(worker_id):
+        rng = random.Random(seed_value * 1000 + worker_id)
+        client = app.test_client()
+        user_id = rng.randint(1, args.users)
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['user_name'] = f'Usuário {user_id}'
+
+        latencies = []
+        for _ in range(args.requests // args.concurrency):
+            method, url, data = build(rng, args.users)
+            start = time.perf_counter()
+            response = client.open(url, method=method, data=data)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise RuntimeError(f'{route}: HTTP {response.status_code}')
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(worker, range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for result in results for latency in result]
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+    }
+
+
+def run_params(args, database_url):
+    # Parâmetros que mudam os números; um SQLite temporário conta apenas como 'sqlite'
+    return {
+        'database': make_url(database_url).render_as_string(hide_password=True) if args.database_url else 'sqlite',
+        'users': args.users,
+        'notes': args.notes,
+        'checklist': args.checklist,
+        'events': args.events,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'cache': args.cache,
+        'seed': args.seed,
+    }
+
+
+def compare_params(params, baseline_params):
+    return [f'{name}: {baseline_params.get(name)!r} -> {value!r}'
+            for name, value in params.items() if baseline_params.get(name) != value]
+
+
+def compare(results, baseline, threshold):
+    # Uma rota regride quando o p95 sobe ou a vazão cai além do limite
+    regressions = []
+    for route, result in results.items():
+        before = baseline.get(route)
+        if before is None:
+            continue
+        if result['p95'] > before['p95'] * (1 + threshold):
+            regressions.append(f'{route}: p95 {before["p95"]:.2f}ms -> {result["p95"]:.2f}ms')
+        if result['throughput'] < before['throughput'] * (1 - threshold):
+            regressions.append(f'{route}: vazão {before["throughput"]:.1f}/s -> {result["throughput"]:.1f}/s')
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='banco usado (padrão: SQLite temporário)')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--notes', type=int, default=20000)
+    parser.add_argument('--checklist', type=int, default=20000)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--no-seed', action='store_true', help='reaproveita os dados já existentes no banco')
+    parser.add_argument('--reset', action='store_true',
+                        help='permite apagar as tabelas de um banco que já existe antes de popular')
+    parser.add_argument('--requests', type=int, default=400, help='requisições por rota')
+    parser.add_argument('--concurrency', type=int, default=8, help='workers simultâneos')
+    parser.add_argument('--routes', nargs='+', choices=list(ROUTES), default=list(ROUTES))
+    parser.add_argument('--cache', action='store_true', help='liga o cache de leitura')
+    parser.add_argument('--seed', type=int, default=42, help='semente dos dados e das requisições')
+    parser.add_argument('--save', help='salva os resultados como baseline neste arquivo JSON')
+    parser.add_argument('--compare', help='compara com o baseline deste arquivo JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='piora tolerada (0.2 = 20%%)')
+    args = parser.parse_args()
+    if args.requests < args.concurrency:
+        parser.error('--requests deve ser maior ou igual a --concurrency')
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = main.create_app({
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'CACHE_ENABLED': args.cache,
+    })
+    params = run_params(args, database_url)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        mismatches = compare_params(params, baseline.get('params', {}))
+        if mismatches:
+            sys.exit('O baseline foi gerado com outros parâmetros: ' + '; '.join(mismatches))
+
+    with app.app_context():
+        if not args.no_seed:
+            tables = main.db.inspect(main.db.engine).get_table_names()
+            if tables and not args.reset:
+                sys.exit(f'O banco já tem tabelas ({", ".join(sorted(tables))}); '
+                         'use --reset para apagá-las ou --no-seed para reaproveitar os dados.')
+            start = time.perf_counter()
+            seed(args, random.Random(args.seed))
+            print(f'Banco populado em {time.perf_counter() - start:.1f}s')
+
+        results = {}
+        print(f'{"rota":<22}{"req/s":>10}{"p50":>10}{"p95":>10}{"p99":>10}')
+        for index, route in enumerate(args.routes):
+            result = bench_route(app, route, args, args.seed + index)
+            results[route] = result
+            print(f'{route:<22}{result["throughput"]:>10.1f}{result["p50"]:>8.2f}ms'
+                  f'{result["p95"]:>8.2f}ms{result["p99"]:>8.2f}ms')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'params': params, 'results': results}, f, indent=2)
+        print(f'Baseline salvo em {args.save}')
+
+    if args.compare:
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print('Regressões:')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print('Nenhuma regressão acima do limite.')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,196 @@
+"""Cache de leitura por usuário para notas, checklist e eventos do calendário.
+
+Os valores são guardados já serializados (JSON) e agrupados em namespaces, como
+``notes:42``, para que uma escrita invalide de uma vez tudo o que foi lido para
+aquele usuário. O backend padrão é um LRU em memória do processo, com TTL e
+limite de memória; outro backend (Redis, memcached...) pode ser usado
+implementando a interface de ``CacheBackend``.
+
+O backend em memória é local a cada processo: uma escrita atendida por um
+worker não invalida os demais. Por isso as rotas incluem na chave uma versão
+do usuário lida do banco a cada requisição (``checklist_version``,
+``notes_version``, ``events_version``); depois de uma escrita em qualquer
+worker, as entradas antigas deixam de ser encontradas e expiram pelo LRU/TTL.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    """Interface dos backends de cache."""
+
+    def get(self, namespace, key):
+        """Devolve o valor serializado (``bytes``), ou ``None`` se não estiver no cache."""
+        raise NotImplementedError
+
+    def generation(self, namespace):
+        """Devolve o contador de invalidações do namespace."""
+        raise NotImplementedError
+
+    def set(self, namespace, key, value, ttl=None, generation=None):
+        """Guarda o valor, exceto se o namespace foi invalidado depois de ``generation``."""
+        raise NotImplementedError
+
+    def invalidate(self, namespace):
+        """Remove todas as entradas do namespace e avança o seu contador."""
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class LRUCache(CacheBackend):
+    """Cache LRU em memória, com TTL e limite de entradas e de tamanho."""
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (namespace, key) -> (expira_em, valor em bytes)
+        self._namespaces = {}  # namespace -> chaves presentes
+        # namespace -> geração da última invalidação, limitado a max_entries namespaces;
+        # os descartados passam a valer _generation_floor, que nunca diminui
+        self._generations = OrderedDict()
+        self._generation_counter = 0
+        self._generation_floor = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, entry_key):
+        _, value = self._entries.pop(entry_key)
+        self._bytes -= len(value)
+        namespace, key = entry_key
+        keys = self._namespaces[namespace]
+        keys.discard(key)
+        if not keys:
+            del self._namespaces[namespace]
+
+    def get(self, namespace, key):
+        entry_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(entry_key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return value
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.get(namespace, self._generation_floor)
+
+    def set(self, namespace, key, value, ttl=None, generation=None):
+        if len(value) > self.max_bytes:
+            return
+
+        entry_key = (namespace, key)
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            # Uma escrita invalidou o namespace enquanto o valor era lido do banco: descarta
+            if generation is not None and generation != self._generations.get(namespace, self._generation_floor):
+                return
+
+            if entry_key in self._entries:
+                self._remove(entry_key)
+
+            self._entries[entry_key] = (expires_at, value)
+            self._namespaces.setdefault(namespace, set()).add(key)
+            self._bytes += len(value)
+
+            # Descarta as entradas usadas há mais tempo até respeitar os limites
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, namespace):
+        with self._lock:
+            for key in list(self._namespaces.get(namespace, ())):
+                self._remove((namespace, key))
+            self._generation_counter += 1
+            self._generations[namespace] = self._generation_counter
+            self._generations.move_to_end(namespace)
+            while len(self._generations) > self.max_entries:
+                _, generation = self._generations.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, generation)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._namespaces.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+
+class Cache:
+    """Fachada usada pelas rotas: serializa os valores e delega ao backend.
+
+    Configuração (``app.config``):
+
+    - ``CACHE_ENABLED``: desliga o cache quando ``False``.
+    - ``CACHE_TTL``: validade das entradas, em segundos.
+    - ``CACHE_MAX_ENTRIES`` e ``CACHE_MAX_BYTES``: limites do backend em memória.
+    """
+
+    def __init__(self, app=None, backend=None):
+        self.backend = backend
+        self.enabled = True
+        self.ttl = 300
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.setdefault('CACHE_ENABLED', True)
+        self.ttl = app.config.setdefault('CACHE_TTL', self.ttl)
+        if self.backend is None:
+            self.backend = LRUCache(
+                max_entries=app.config.setdefault('CACHE_MAX_ENTRIES', 10000),
+                max_bytes=app.config.setdefault('CACHE_MAX_BYTES', 64 * 1024 * 1024),
+            )
+        app.extensions['cache'] = self
+
+    def get_or_load(self, namespace, key, loader):
+        """Devolve o valor em cache ou chama ``loader()`` e guarda o resultado."""
+        if not self.enabled:
+            return loader()
+
+        value = self.backend.get(namespace, key)
+        if value is not None:
+            return json.loads(value)
+
+        # Lido antes da consulta, para não guardar um resultado anterior a uma invalidação
+        generation = self.backend.generation(namespace)
+        result = loader()
+        # Guardado em bytes (UTF-8), para que o limite de memória conte bytes e não caracteres
+        self.backend.set(namespace, key, json.dumps(result).encode(), ttl=self.ttl, generation=generation)
+        return result
+
+    def invalidate(self, namespace):
+        self.backend.invalidate(namespace)
+
+    def stats(self):
+        return self.backend.stats()
@@ -0,0 +1,259 @@
+"""Fluxo de alterações por usuário, enviado aos clientes via Server-Sent Events.
+
+As alterações de ``Checklist`` e ``CalendarEvent`` são publicadas após o commit
+e guardadas em um buffer circular por usuário. Cada cliente recebe as novas
+alterações e, ao reconectar com o último id recebido (``Last-Event-ID``),
+continua de onde parou; se esse id já saiu do buffer, recebe um ``reset`` e
+recarrega o estado pelas rotas normais.
+
+Backends (``CHANGES_BACKEND``):
+
+- ``local``: entrega apenas dentro do processo (um único worker).
+- ``postgresql``: publica com ``NOTIFY`` e cada processo escuta com ``LISTEN``
+  (psycopg2), de modo que todos os workers recebem as alterações na mesma
+  ordem. A retomada funciona em qualquer worker, pois compara a posição do id
+  no buffer, não o seu valor.
+
+Cada conexão SSE ocupa uma thread do servidor enquanto estiver aberta; em
+produção use workers com threads ou assíncronos (gunicorn ``--worker-class
+gthread --threads N`` ou ``gevent``). Para não prender a thread indefinidamente,
+o fluxo termina após ``CHANGES_STREAM_TIMEOUT`` segundos e o navegador
+reconecta sozinho, retomando pelo ``Last-Event-ID``.
+"""
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from sqlalchemy import text
+
+# Canal do LISTEN/NOTIFY no PostgreSQL
+CHANNEL = 'planit_changes'
+
+# Enviado no lugar de uma alteração quando o cliente precisa recarregar o estado
+RESET = 'reset'
+
+logger = logging.getLogger(__name__)
+
+
+class _Buffer:
+    def __init__(self, size):
+        self.events = deque(maxlen=size)  # (id, alteração)
+        self.total = 0  # alterações já publicadas, incluindo as que saíram do buffer
+        self.discarded = False  # removido do broker: quem ainda o lê precisa recarregar
+        self.condition = threading.Condition()  # acorda apenas os clientes deste usuário
+
+    def discard(self):
+        with self.condition:
+            self.discarded = True
+            self.condition.notify_all()
+
+    def append(self, event_id, change):
+        self.events.append((event_id, change))
+        self.total += 1
+
+    def last_id(self):
+        return self.events[-1][0] if self.events else None
+
+    def position_of(self, event_id):
+        for index, (current_id, _) in enumerate(self.events):
+            if current_id == event_id:
+                return self.total - len(self.events) + index
+        return None
+
+    def since(self, seen):
+        # Alterações com posição >= seen, ou None se algumas já foram descartadas
+        if self.discarded:
+            return None
+        missing = self.total - seen
+        if missing > len(self.events):
+            return None
+        return list(self.events)[len(self.events) - missing:] if missing else []
+
+
+class ChangeBroker:
+    """Distribui as alterações publicadas para os clientes conectados de cada usuário.
+
+    Configuração (``app.config``):
+
+    - ``CHANGES_BACKEND``: ``local`` ou ``postgresql``.
+    - ``CHANGES_BUFFER_SIZE``: alterações guardadas por usuário para a retomada.
+    - ``CHANGES_MAX_USERS``: usuários com buffer em memória.
+    - ``CHANGES_HEARTBEAT``: segundos entre os pings enviados a conexões ociosas.
+    - ``CHANGES_STREAM_TIMEOUT``: duração máxima, em segundos, de cada conexão.
+    """
+
+    def __init__(self, app=None, db=None):
+        self.backend = 'local'
+        self.buffer_size = 500
+        self.max_users = 10000
+        self.heartbeat = 15
+        self.stream_timeout = 300
+        self._db = None
+        self._lock = threading.Lock()  # protege o dicionário de buffers
+        self._buffers = OrderedDict()  # user_id -> _Buffer
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.backend = app.config.setdefault('CHANGES_BACKEND', self.backend)
+        self.buffer_size = app.config.setdefault('CHANGES_BUFFER_SIZE', self.buffer_size)
+        self.max_users = app.config.setdefault('CHANGES_MAX_USERS', self.max_users)
+        self.heartbeat = app.config.setdefault('CHANGES_HEARTBEAT', self.heartbeat)
+        self.stream_timeout = app.config.setdefault('CHANGES_STREAM_TIMEOUT', self.stream_timeout)
+        self._db = db
+        app.extensions['changes'] = self
+
+    def publish(self, changes):
+        """Publica uma lista de ``(user_id, alteração)``; deve ser chamado após o commit."""
+        messages = [(user_id, uuid.uuid4().hex, change) for user_id, change in changes]
+
+        if self.backend == 'postgresql':
+            self._start_listener()
+            # A escrita já foi gravada: uma falha aqui só atrasa os clientes até o próximo reset
+            try:
+                with self._db.engine.connect() as conn:
+                    for user_id, event_id, change in messages:
+                        payload = json.dumps({'user_id': user_id, 'id': event_id, 'change': change})
+                        conn.execute(text('SELECT pg_notify(:channel, :payload)'),
+                                     {'channel': CHANNEL, 'payload': payload})
+                    conn.commit()
+            except Exception:
+                logger.exception('Falha no NOTIFY %s; %d alterações não publicadas', CHANNEL, len(messages))
+        else:
+            for user_id, event_id, change in messages:
+                self._deliver(user_id, event_id, change)
+
+    def subscribe(self, user_id, last_event_id=None):
+        """Devolve um gerador de ``(id, alteração)`` para o usuário.
+
+        Gera ``(None, None)`` a cada heartbeat sem alterações e ``(id, RESET)``
+        quando alterações foram perdidas e o cliente deve recarregar; ``id`` é a
+        alteração mais recente do buffer (ou ``None``), de onde o cliente retoma
+        ao reconectar. Termina após ``stream_timeout`` segundos.
+        """
+        if self.backend == 'postgresql':
+            self._start_listener()
+
+        with self._lock:
+            buffer = self._buffer(user_id)
+            with buffer.condition:
+                seen = buffer.total
+                reset = False
+                if last_event_id:
+                    position = buffer.position_of(last_event_id)
+                    if position is None:
+                        reset = True
+                    else:
+                        seen = position + 1
+                reset_id = buffer.last_id()
+
+        return self._stream(user_id, buffer, seen, reset, reset_id)
+
+    def _stream(self, user_id, buffer, seen, reset, reset_id):
+        if reset:
+            yield reset_id, RESET
+
+        deadline = time.monotonic() + self.stream_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            with buffer.condition:
+                events = buffer.since(seen)
+                if events == []:
+                    buffer.condition.wait(min(self.heartbeat, remaining))
+                    events = buffer.since(seen)
+                seen = buffer.total
+
+            if events is None:
+                # Buffer descartado, estouro ou listener reconectado: o cliente recarrega
+                with self._lock:
+                    buffer = self._buffer(user_id)
+                    with buffer.condition:
+                        seen = buffer.total
+                        reset_id = buffer.last_id()
+                yield reset_id, RESET
+                continue
+
+            if not events:
+                yield None, None
+            for item in events:
+                yield item
+
+    def _buffer(self, user_id):
+        # Chamado com self._lock; a ordem dos locks é sempre broker -> buffer
+        buffer = self._buffers.get(user_id)
+        if buffer is None:
+            buffer = self._buffers[user_id] = _Buffer(self.buffer_size)
+            if len(self._buffers) > self.max_users:
+                _, evicted = self._buffers.popitem(last=False)
+                evicted.discard()
+        else:
+            self._buffers.move_to_end(user_id)
+        return buffer
+
+    def _deliver(self, user_id, event_id, change):
+        with self._lock:
+            buffer = self._buffer(user_id)
+            with buffer.condition:
+                buffer.append(event_id, change)
+                buffer.condition.notify_all()
+
+    def _discard_all(self):
+        with self._lock:
+            buffers = list(self._buffers.values())
+            self._buffers.clear()
+            for buffer in buffers:
+                buffer.discard()
+
+    def _start_listener(self):
+        # A thread do LISTEN só é criada no primeiro uso, já dentro do processo do worker
+        if self._listener is not None:
+            return
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, args=(self._db.engine,),
+                                                  name='planit-changes-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self, engine):
+        reconnecting = False
+        while True:
+            conn = None
+            try:
+                # Conexão dedicada, retirada do pool, em modo autocommit
+                raw = engine.raw_connection()
+                raw.detach()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                conn.cursor().execute(f'LISTEN {CHANNEL}')
+
+                # Alterações publicadas enquanto estava desconectado foram perdidas
+                if reconnecting:
+                    self._discard_all()
+                reconnecting = True
+
+                while True:
+                    if select.select([conn], [], [], self.heartbeat) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        message = json.loads(conn.notifies.pop(0).payload)
+                        self._deliver(message['user_id'], message['id'], message['change'])
+            except Exception:
+                logger.exception('Falha no LISTEN %s; reconectando', CHANNEL)
+                time.sleep(1)
+            finally:
+                # A conexão foi retirada do pool: se não for fechada aqui, vaza a cada reconexão
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
@@ -0,0 +1,163 @@
+"""Instrumentação das requisições: latência por rota, consultas SQL e tempo de banco.
+
+Os tempos são medidos nos hooks ``before_request``/``after_request`` do Flask e
+as consultas nos eventos ``before_cursor_execute``/``after_cursor_execute`` do
+SQLAlchemy. ``render()`` gera o formato texto do Prometheus. Os valores são por
+processo: com vários workers, cada um expõe os seus.
+"""
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Limites (em segundos) dos buckets do histograma de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Limites dos buckets do histograma de consultas por requisição
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0
+
+    def observe(self, value):
+        for index, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+
+class Metrics:
+    """Coleta as métricas das requisições e as expõe no formato do Prometheus.
+
+    Configuração (``app.config``):
+
+    - ``METRICS_QUERY_BUDGET``: máximo de consultas SQL por requisição antes de registrar um aviso.
+    """
+
+    def __init__(self, app=None):
+        self.query_budget = 20
+        self._lock = threading.Lock()
+        self._latency = {}  # (rota, método) -> Histogram
+        self._queries = {}  # rota -> Histogram
+        self._db_time = {}  # rota -> segundos
+        self._requests = {}  # (rota, método, status) -> total
+        self._collectors = []
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.query_budget = app.config.setdefault('METRICS_QUERY_BUDGET', self.query_budget)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.extensions['metrics'] = self
+
+        # Os eventos valem para qualquer engine; fora de uma requisição são ignorados
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+
+    def add_collector(self, collector):
+        """Registra uma função que devolve métricas extras como ``(nome, tipo, ajuda, valor)``."""
+        self._collectors.append(collector)
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_db_time = 0.0
+
+    def _after_request(self, response):
+        if 'metrics_start' not in g:
+            return response
+
+        elapsed = time.perf_counter() - g.metrics_start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        queries = g.metrics_queries
+        db_time = g.metrics_db_time
+
+        with self._lock:
+            self._latency.setdefault((route, request.method), Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            self._queries.setdefault(route, Histogram(QUERY_BUCKETS)).observe(queries)
+            self._db_time[route] = self._db_time.get(route, 0.0) + db_time
+            key = (route, request.method, response.status_code)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+        if queries > self.query_budget:
+            current_app.logger.warning(
+                '%s %s executou %d consultas SQL (limite %d) em %.1fms de banco',
+                request.method, route, queries, self.query_budget, db_time * 1000)
+
+        return response
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines.append('# HELP planit_requests_total Requisições atendidas.')
+            lines.append('# TYPE planit_requests_total counter')
+            for (route, method, status), total in sorted(self._requests.items()):
+                lines.append(f'planit_requests_total{{route="{route}",method="{method}",status="{status}"}} {total}')
+
+            lines.append('# HELP planit_request_duration_seconds Latência das requisições.')
+            lines.append('# TYPE planit_request_duration_seconds histogram')
+            for (route, method), histogram in sorted(self._latency.items()):
+                _render_histogram(lines, 'planit_request_duration_seconds',
+                                  f'route="{route}",method="{method}"', histogram)
+
+            lines.append('# HELP planit_db_queries Consultas SQL por requisição.')
+            lines.append('# TYPE planit_db_queries histogram')
+            for route, histogram in sorted(self._queries.items()):
+                _render_histogram(lines, 'planit_db_queries', f'route="{route}"', histogram)
+
+            lines.append('# HELP planit_db_time_seconds_total Tempo gasto em consultas SQL.')
+            lines.append('# TYPE planit_db_time_seconds_total counter')
+            for route, total in sorted(self._db_time.items()):
+                lines.append(f'planit_db_time_seconds_total{{route="{route}"}} {total}')
+
+        for collector in self._collectors:
+            for name, kind, help_text, value in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _render_histogram(lines, name, labels, histogram):
+    for limit, count in zip(histogram.buckets, histogram.counts):
+        lines.append(f'{name}_bucket{{{labels},le="{limit}"}} {count}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.total}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.total}')
+
+
+# O início de cada consulta fica no contexto de execução, que é descartado junto com ela,
+# e não na conexão do pool, que sobrevive à requisição
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and has_request_context() and 'metrics_start' in g:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _observe_query(context)
+
+
+def _handle_error(exception_context):
+    # Consultas que falham não chegam ao after_cursor_execute, mas também contam
+    _observe_query(exception_context.execution_context)
+
+
+def _observe_query(context):
+    start = getattr(context, '_metrics_start', None)
+    if start is not None and has_request_context() and 'metrics_start' in g:
+        del context._metrics_start
+        g.metrics_queries += 1
+        g.metrics_db_time += time.perf_counter() - start
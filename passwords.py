@@ -0,0 +1,127 @@
+"""Hash e verificação de senhas em um pool de processos limitado.
+
+As funções de derivação de chave (scrypt/pbkdf2) são caras em CPU; executá-las
+em processos separados evita que um pico de logins segure o GIL e trave as
+demais requisições do mesmo worker.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordPoolBusy(Exception):
+    """A fila do pool de hash está cheia (ou a tarefa demorou demais)."""
+
+
+class PasswordHasher:
+    """Executa ``generate_password_hash``/``check_password_hash`` em um pool de processos.
+
+    Configuração (``app.config``):
+
+    - ``PASSWORD_HASH_METHOD``: método completo do werkzeug, ex. ``scrypt:32768:8:1``
+      ou ``pbkdf2:sha256:1000000``. Hashes salvos com outro método são refeitos no login.
+    - ``PASSWORD_POOL_WORKERS``: número de processos; ``0`` executa no próprio processo.
+    - ``PASSWORD_POOL_QUEUE``: quantas tarefas podem esperar além das em execução.
+    - ``PASSWORD_POOL_TIMEOUT``: segundos de espera pelo resultado.
+    """
+
+    def __init__(self, app=None, method='scrypt:32768:8:1', workers=None, queue_limit=None, timeout=30):
+        self.method = method
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.queue_limit = self.workers * 4 if queue_limit is None else queue_limit
+        self.timeout = timeout
+        self._executor = None
+        self._normalized_method = None  # (método configurado, método completo)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.setdefault('PASSWORD_HASH_METHOD', self.method)
+        self.workers = app.config.setdefault('PASSWORD_POOL_WORKERS', self.workers)
+        self.queue_limit = app.config.setdefault('PASSWORD_POOL_QUEUE', self.queue_limit)
+        self.timeout = app.config.setdefault('PASSWORD_POOL_TIMEOUT', self.timeout)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+        app.extensions['password_hasher'] = self
+
+    def _get_executor(self):
+        # O pool só é criado no primeiro uso, já dentro do processo do worker. Os processos
+        # não são criados por fork, que copiaria um servidor com várias threads.
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def _reset_executor(self, executor):
+        # Um processo do pool morreu (OOM, segfault): descarta o pool para recriá-lo no próximo uso
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, fn, *args):
+        if self.workers == 0:
+            return fn(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise PasswordPoolBusy()
+
+        # Uma nova tentativa se o pool estiver quebrado
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+                continue
+            except BaseException:
+                self._slots.release()
+                raise
+
+            # O slot só é liberado quando a tarefa termina, mesmo após um timeout
+            future.add_done_callback(lambda _: self._slots.release())
+            try:
+                return future.result(timeout=self.timeout)
+            except TimeoutError:
+                future.cancel()  # Ainda na fila: sai da fila e libera o slot
+                raise PasswordPoolBusy()
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+                if not self._slots.acquire(blocking=False):
+                    raise PasswordPoolBusy()
+
+        self._slots.release()
+        raise PasswordPoolBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # O hash do werkzeug tem o formato "método$salt$hash"
+        return pwhash.split('$', 1)[0] != self.normalized_method
+
+    @property
+    def normalized_method(self):
+        # O werkzeug completa métodos curtos ("scrypt" vira "scrypt:32768:8:1"): compara com
+        # o prefixo de um hash gerado, calculado uma única vez
+        if self._normalized_method is None or self._normalized_method[0] != self.method:
+            prefix = generate_password_hash('', self.method).split('$', 1)[0]
+            self._normalized_method = (self.method, prefix)
+        return self._normalized_method[1]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None